@@ -4,13 +4,18 @@
 # ---------------------------------------------------------------------------
 
 import asyncio
+import json
 import logging
 import os
 import re
+import shutil
+import subprocess
 import tempfile
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
 
+import cv2
 from fastapi import HTTPException
 
 try:
@@ -42,13 +47,14 @@ ALLOWED_VIDEO_MIMETYPES = {"video/mp4", "video/webm", "video/quicktime", "video/
 TEMP_DIR = Path(tempfile.gettempdir()) / "blurthatguy"
 TEMP_DIR.mkdir(exist_ok=True)
 CHUNK_SIZE = 1024 * 1024 * 2
-UUID_PATTERN = re.compile(r"^[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}$")
+UUID_PATTERN = re.compile(r"[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}")
 
 try:
     _max_upload_raw = os.environ.get("MAX_UPLOAD_SIZE_MB", "").strip()
     MAX_UPLOAD_SIZE_MB = int(_max_upload_raw) if _max_upload_raw else 0
 except Exception:
     MAX_UPLOAD_SIZE_MB = 0
+MAX_UPLOAD_BYTES = max(0, MAX_UPLOAD_SIZE_MB) * 1024 * 1024  # 0 = unlimited
 
 
 # ---------------------------------------------------------------------------
@@ -56,7 +62,7 @@ except Exception:
 # ---------------------------------------------------------------------------
 
 def validate_video_id(video_id: str) -> str:
-    if not UUID_PATTERN.match(video_id):
+    if not UUID_PATTERN.fullmatch(video_id):
         raise HTTPException(status_code=400, detail="Invalid video ID format")
     return video_id
 
@@ -75,21 +81,136 @@ def validate_video_file(filename: str | None, content_type: str | None) -> None:
         raise HTTPException(status_code=400, detail="Invalid video MIME type")
 
 
+# ISO-BMFF (mp4/mov) top-level box types that can legitimately open a file.
+_ISO_BMFF_BOXES = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot"}
+
+
+def sniff_video_magic(video_path: Path) -> bool:
+    """Cheap container check on the first bytes: mp4/mov, webm/mkv (EBML) or avi (RIFF)."""
+    try:
+        with open(video_path, "rb") as f:
+            head = f.read(12)
+    except OSError:
+        return False
+    if head[4:8] in _ISO_BMFF_BOXES:
+        return True
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return True
+    return head[:4] == b"RIFF" and head[8:12] == b"AVI "
+
+
+def preallocate_file(handle, size: int) -> None:
+    """Best-effort reservation of `size` bytes so large uploads land in contiguous extents.
+    The file is extended to `size`; callers truncate to the bytes actually written."""
+    if size <= 0 or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(handle.fileno(), 0, size)
+    except OSError:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Video metadata
+# ---------------------------------------------------------------------------
+
+def open_capture(video_path: Path) -> cv2.VideoCapture:
+    """VideoCapture on the FFmpeg backend with hardware decoding where the OpenCV build and
+    host support it; OpenCV silently falls back to software decode otherwise."""
+    cap = cv2.VideoCapture(
+        str(video_path), cv2.CAP_FFMPEG,
+        [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY],
+    )
+    if not cap.isOpened():
+        cap = cv2.VideoCapture(str(video_path))
+    return cap
+
+
+@lru_cache(maxsize=256)
+def _probe_video_cached(path: str, mtime_ns: int, size: int) -> dict | None:
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None
+    try:
+        return {
+            "fps": float(cap.get(cv2.CAP_PROP_FPS)) or 30.0,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "frameCount": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        }
+    finally:
+        cap.release()
+
+
+def probe_video(video_path: Path) -> dict | None:
+    """Read basic stream metadata; returns None if the file is missing or unreadable.
+    Cached per (path, mtime, size) so upload, detection and export open the container once."""
+    try:
+        st = video_path.stat()
+    except OSError:
+        return None
+    meta = _probe_video_cached(str(video_path), st.st_mtime_ns, st.st_size)
+    return dict(meta) if meta is not None else None
+
+
+def probe_uploaded_video(video_path: Path) -> dict | None:
+    """Container sniff plus probe_video for freshly uploaded files, so the endpoints can
+    run both off the event loop in one call. None when either check fails."""
+    if not sniff_video_magic(video_path):
+        return None
+    return probe_video(video_path)
+
+
+@lru_cache(maxsize=256)
+def _probe_stream_cached(path: str, mtime_ns: int, size: int) -> dict | None:
+    if not shutil.which("ffprobe"):
+        return None
+    try:
+        proc = subprocess.run(
+            [
+                "ffprobe", "-v", "error", "-select_streams", "v:0",
+                "-show_entries", "stream=codec_name,profile,pix_fmt", "-of", "json", path,
+            ],
+            capture_output=True,
+            timeout=10,
+        )
+        streams = json.loads(proc.stdout).get("streams") if proc.returncode == 0 else None
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+    return streams[0] if streams else None
+
+
+def probe_video_stream(video_path: Path) -> dict | None:
+    """codec_name / profile / pix_fmt of the first video stream via ffprobe, or None when
+    ffprobe is unavailable or fails. Cached per (path, mtime, size) like probe_video."""
+    try:
+        st = video_path.stat()
+    except OSError:
+        return None
+    info = _probe_stream_cached(str(video_path), st.st_mtime_ns, st.st_size)
+    return dict(info) if info is not None else None
+
+
 # ---------------------------------------------------------------------------
 # File cleanup
 # ---------------------------------------------------------------------------
 
 def cleanup_old_files() -> None:
     try:
-        cutoff = datetime.now() - timedelta(hours=1)
+        cutoff = (datetime.now() - timedelta(hours=1)).timestamp()
         count = 0
-        for p in TEMP_DIR.glob("*"):
-            if not p.is_file():
-                continue
-            if datetime.fromtimestamp(p.stat().st_mtime) >= cutoff:
-                continue
-            p.unlink(missing_ok=True)
-            count += 1
+        # scandir hands back the file type with each entry, so only one stat() per file.
+        with os.scandir(TEMP_DIR) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                    continue
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+                count += 1
         if count:
             logger.info(f"Cleaned up {count} old temporary files")
     except Exception as e:
@@ -99,7 +220,7 @@ def cleanup_old_files() -> None:
 async def periodic_cleanup() -> None:
     while True:
         await asyncio.sleep(3600)
-        cleanup_old_files()
+        await asyncio.to_thread(cleanup_old_files)
 
 
 # ---------------------------------------------------------------------------
@@ -9,11 +9,14 @@ import queue
 import shutil
 import subprocess
 import threading
-import cv2
-import numpy as np
+import time
+from collections import deque
 from pathlib import Path
 from typing import Any, Callable
 
+import cv2
+import numpy as np
+import orjson
 
 # ---------------------------------------------------------------------------
 # Detection stream
@@ -51,7 +54,7 @@ def detect_stream_generator(
                 thread_budget=int(stream_budget) if stream_budget else None,
                 cancel_token=stream_token,
             )
-            message_queue.put(json.dumps({"type": "results", "results": tracks}) + "\n")
+            message_queue.put(orjson.dumps({"type": "results", "results": tracks}) + b"\n")
             set_job_status(r, job_id, "done")
         except InterruptedError:
             logger.info(f"Streaming job {job_id} cancelled during processing")
@@ -86,6 +89,38 @@ def detect_stream_generator(
 # Export stream
 # ---------------------------------------------------------------------------
 
+# Stream copy is only safe when the source already matches what the encode path produces
+# for browsers: 8-bit 4:2:0 H.264 in a profile every player decodes.
+_PASSTHROUGH_PROFILES = {"Constrained Baseline", "Baseline", "Main", "High"}
+_REMUX_TIMEOUT_S = 600
+# Raw frames held between decode and encode (read queue + blur window + write queue).
+# Splitting a byte budget keeps 4K exports from holding gigabytes of bgr24 frames.
+_EXPORT_FRAME_BUDGET_BYTES = 512 * 1024 * 1024
+_WRITER_JOIN_TIMEOUT_S = 60
+
+
+def _can_stream_copy(stream: dict | None) -> bool:
+    return bool(stream) and (
+        stream.get("codec_name") == "h264"
+        and stream.get("pix_fmt") == "yuv420p"
+        and stream.get("profile") in _PASSTHROUGH_PROFILES
+    )
+
+
+def _start_remux(input_path: Path, output_path: Path) -> subprocess.Popen:
+    """Nothing to blur: copy the H.264 stream instead of decoding and re-encoding every frame."""
+    return subprocess.Popen(
+        [
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-i", str(input_path),
+            "-map", "0:v:0", "-map", "0:a:0?", "-c:v", "copy", "-c:a", "aac",
+            "-movflags", "+faststart",
+            str(output_path),
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+
+
 def export_stream_generator(
         *,
         video_id: str,
@@ -93,11 +128,16 @@ def export_stream_generator(
         tracks: list[dict],
         input_path: Path,
         output_path: Path,
-        precompute_track_lookups: Callable[..., Any],
+        precompute_frame_plan: Callable[..., list[list[list[float]]]],
+        pad_frame_plan: Callable[..., list[list[list[int]]]],
+        probe_video: Callable[[Path], dict | None],
+        probe_video_stream: Callable[[Path], dict | None],
+        open_capture: Callable[[Path], Any],
         get_thread_pool: Callable[[], Any],
         detector_pool_size: int,
         get_encoder: Callable[[], str],
         encoder_args: dict[str, list[str]],
+        decoder_args: list[str],
         get_safe_video_path: Callable[[str, str], Path],
         blur_frame: Callable[..., Any],
         logger,
@@ -105,9 +145,11 @@ def export_stream_generator(
 ):
     if cancel_event is None:
         cancel_event = threading.Event()
-    cap = out = ffmpeg_proc = dec = None
+    cap = out = ffmpeg_proc = dec = remux = None
     stderr_chunks: list[bytes] = []
     stderr_thread: threading.Thread | None = None
+    writer_thread: threading.Thread | None = None
+    writer_errors: list[BaseException] = []
     try:
         selected_set = set(int(i) for i in export_request.selectedTrackIds)
         tracks_map = {t["id"]: t for t in tracks if int(t["id"]) in selected_set}
@@ -121,25 +163,54 @@ def export_stream_generator(
                 f"{sorted(t['id'] for t in tracks)[:20]}"
             )
 
-        cap = cv2.VideoCapture(str(input_path))
-        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        total_frames = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 1)
-        cap.release()
-        cap = None
+        meta = probe_video(input_path)
+        if meta is None:
+            raise RuntimeError("Could not open video file")
+        fps, width, height = meta["fps"], meta["width"], meta["height"]
+        total_frames = max(meta["frameCount"], 1)
+        frame_size = width * height * 3
+        budget_frames = _EXPORT_FRAME_BUDGET_BYTES // max(frame_size, 1)
+        write_queue: queue.Queue = queue.Queue(maxsize=max(2, min(32, budget_frames // 4)))
 
         max_gap = 12 * max(export_request.sampleRate, 1)  # max_misses * sample_rate
-        track_lookup_dicts = precompute_track_lookups([t["frames"] for t in tracks_map.values()], total_frames,
-                                                      max_gap=max_gap)
-        pad, target_blocks, blur_mode = export_request.padding, export_request.targetBlocks, export_request.blurMode
+        frame_plan = precompute_frame_plan([t["frames"] for t in tracks_map.values()], total_frames,
+                                           max_gap=max_gap)
+        frame_plan = pad_frame_plan(frame_plan, export_request.padding, width, height)
+        target_blocks, blur_mode = export_request.targetBlocks, export_request.blurMode
         pool = get_thread_pool()
-        chunk: list[tuple] = []
         frames_written = 0
         chunk_size = min(detector_pool_size, 16)
         use_ffmpeg = shutil.which("ffmpeg") and width > 0 and height > 0
 
         yield json.dumps({"type": "progress", "progress": 5}) + "\n"
 
+        if use_ffmpeg and not any(frame_plan) and _can_stream_copy(probe_video_stream(input_path)):
+            remux = _start_remux(input_path, output_path)
+            deadline = time.monotonic() + _REMUX_TIMEOUT_S
+            remux_err = b""
+            while True:
+                try:
+                    _, remux_err = remux.communicate(timeout=1.0)
+                    break
+                except subprocess.TimeoutExpired:
+                    if cancel_event.is_set() or time.monotonic() > deadline:
+                        remux.kill()
+                        remux.communicate()
+                        break
+                    # Keeps the stream alive; a client disconnect surfaces here as GeneratorExit.
+                    yield json.dumps({"type": "progress", "progress": 5}) + "\n"
+            if cancel_event.is_set():
+                output_path.unlink(missing_ok=True)
+                return
+            if remux.returncode == 0:
+                logger.info(f"Export complete (no frames to blur, stream copied): {video_id}")
+                yield json.dumps({"type": "progress", "progress": 90}) + "\n"
+                yield json.dumps({"type": "done"}) + "\n"
+                return
+            logger.warning(
+                f"Passthrough remux failed - re-encoding instead: {remux_err.decode(errors='ignore')}"
+            )
+
         if use_ffmpeg:
             enc = get_encoder()
             ffmpeg_proc = subprocess.Popen(
@@ -149,6 +220,8 @@ def export_stream_generator(
                     "-i", "pipe:0", "-i", str(input_path),
                     *encoder_args[enc],
                     "-pix_fmt", "yuv420p", "-c:a", "aac", "-map", "0:v:0", "-map", "1:a:0?", "-shortest",
+                    # moov atom up front so the browser can start playback while downloading
+                    "-movflags", "+faststart",
                     str(output_path),
                 ],
                 stdin=subprocess.PIPE,
@@ -166,7 +239,7 @@ def export_stream_generator(
             stderr_thread.start()
             dec = subprocess.Popen(
                 [
-                    "ffmpeg", "-hide_banner", "-loglevel", "fatal", "-i", str(input_path),
+                    "ffmpeg", "-hide_banner", "-loglevel", "fatal", *decoder_args, "-i", str(input_path),
                     "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
                 ],
                 stdout=subprocess.PIPE,
@@ -175,51 +248,73 @@ def export_stream_generator(
         else:
             raw_path = get_safe_video_path(video_id, "_raw.mp4")
             out = cv2.VideoWriter(str(raw_path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
-            cap = cv2.VideoCapture(str(input_path))
+            cap = open_capture(input_path)
+
+        def _frame_writer() -> None:
+            # Encoder writes run here so blurring the next frames overlaps with the pipe write.
+            next_frame = write_queue.get
+            try:
+                if ffmpeg_proc:
+                    poll, pipe_write = ffmpeg_proc.poll, ffmpeg_proc.stdin.write
+                    while (frame := next_frame()) is not None:
+                        if poll() is not None:
+                            err = b"".join(stderr_chunks).decode(errors="ignore")
+                            raise RuntimeError(f"ffmpeg exited early: {err}")
+                        try:
+                            pipe_write(frame.data)  # frames are C-contiguous; no tobytes() copy
+                        except (BrokenPipeError, ValueError):
+                            err = b"".join(stderr_chunks).decode(errors="ignore")
+                            raise RuntimeError(f"ffmpeg pipe broken: {err}")
+                else:
+                    video_write = out.write
+                    while (frame := next_frame()) is not None:
+                        video_write(frame)
+            except BaseException as e:
+                writer_errors.append(e)
+                while write_queue.get() is not None:  # keep the producer unblocked
+                    pass
+
+        writer_thread = threading.Thread(target=_frame_writer, daemon=True)
+        writer_thread.start()
 
         def write_frame(frame: np.ndarray) -> None:
             nonlocal frames_written
-            if ffmpeg_proc:
-                if ffmpeg_proc.poll() is not None:
-                    err = b"".join(stderr_chunks).decode(errors="ignore")
-                    raise RuntimeError(f"ffmpeg exited early: {err}")
-                try:
-                    ffmpeg_proc.stdin.write(frame.tobytes())
-                except (BrokenPipeError, ValueError):
-                    err = b"".join(stderr_chunks).decode(errors="ignore")
-                    raise RuntimeError(f"ffmpeg pipe broken: {err}")
-            else:
-                out.write(frame)
+            if writer_errors:
+                raise writer_errors[0]
+            write_queue.put(frame)
             frames_written += 1
 
-        def flush_chunk(chunk_items: list[tuple]) -> str:
-            futs = [pool.submit(blur_frame, item) for item in chunk_items]
-            for fut in futs:
-                _, frame = fut.result()
-                write_frame(frame)
-            progress = min(70, round(5 + frames_written / total_frames * 65, 1))
-            return json.dumps({"type": "progress", "progress": progress}) + "\n"
+        def finish_writes() -> None:
+            write_queue.put(None)
+            writer_thread.join(timeout=_WRITER_JOIN_TIMEOUT_S)
+            if writer_thread.is_alive():
+                raise RuntimeError("Frame writer did not finish")
+            if writer_errors:
+                raise writer_errors[0]
 
-        frame_size = width * height * 3
-        read_queue: queue.Queue = queue.Queue(maxsize=min(chunk_size * 3, 48))
+        read_depth = max(2, min(chunk_size * 3, 48, budget_frames // 4))
+        read_queue: queue.Queue = queue.Queue(maxsize=read_depth)
 
         def _frame_reader() -> None:
             fi_r = 0
+            put, is_cancelled = read_queue.put, cancel_event.is_set
             try:
                 if dec:
-                    while not cancel_event.is_set():
-                        raw = dec.stdout.read(frame_size)
-                        if not raw or len(raw) < frame_size:
+                    readinto, shape = dec.stdout.readinto, (height, width, 3)
+                    while not is_cancelled():
+                        # Fresh writable buffer per frame (blurred in place), filled without a copy.
+                        buf = bytearray(frame_size)
+                        if readinto(buf) < frame_size:
                             break
-                        frame = np.frombuffer(raw, np.uint8).reshape((height, width, 3)).copy()
-                        read_queue.put((fi_r, frame))
+                        put((fi_r, np.frombuffer(buf, np.uint8).reshape(shape)))
                         fi_r += 1
                 else:
-                    while not cancel_event.is_set():
-                        ret, frame = cap.read()
+                    read = cap.read
+                    while not is_cancelled():
+                        ret, frame = read()
                         if not ret:
                             break
-                        read_queue.put((fi_r, frame))
+                        put((fi_r, frame))
                         fi_r += 1
             finally:
                 read_queue.put(None)
@@ -227,30 +322,47 @@ def export_stream_generator(
         reader_thread = threading.Thread(target=_frame_reader, daemon=True)
         reader_thread.start()
 
-        while not cancel_event.is_set():
-            item = read_queue.get()
+        # Frames leave in decode order through a sliding window of (blur future, frame) pairs:
+        # the oldest is written as soon as it is done while later frames keep blurring.
+        pending: deque = deque()
+        window = max(2, min(chunk_size * 2, budget_frames // 2))
+
+        def write_oldest() -> None:
+            fut, frame = pending.popleft()
+            if fut is not None:
+                _, frame = fut.result()
+            write_frame(frame)
+
+        # Hot loop: bind lookups to locals once instead of per frame.
+        next_item, is_cancelled = read_queue.get, cancel_event.is_set
+        submit, add_pending = pool.submit, pending.append
+        plan_len = len(frame_plan)
+        next_progress_at = 30
+        while not is_cancelled():
+            item = next_item()
             if item is None:
                 break
             fi, frame = item
 
-            if not any(fi in lu for lu in track_lookup_dicts):
-                if chunk:
-                    yield flush_chunk(chunk)
-                    chunk = []
+            rects = frame_plan[fi] if fi < plan_len else None
+            if rects:
+                add_pending((submit(blur_frame, (fi, frame, rects, target_blocks, blur_mode)), frame))
+            elif pending:
+                add_pending((None, frame))  # keep order behind frames still blurring
+            else:
                 write_frame(frame)
-                if frames_written % 30 == 0:
-                    progress = min(70, round(5 + frames_written / total_frames * 65, 1))
-                    yield json.dumps({"type": "progress", "progress": progress}) + "\n"
-                continue
+            while pending and (len(pending) > window or pending[0][0] is None or pending[0][0].done()):
+                write_oldest()
 
-            chunk.append((fi, frame, track_lookup_dicts, pad, target_blocks, width, height, blur_mode))
-            if len(chunk) >= chunk_size:
-                yield flush_chunk(chunk)
-                chunk = []
+            if frames_written >= next_progress_at:
+                next_progress_at = frames_written + 30
+                progress = min(70, round(5 + frames_written / total_frames * 65, 1))
+                yield json.dumps({"type": "progress", "progress": progress}) + "\n"
 
         reader_thread.join(timeout=30)
-        if chunk:
-            yield flush_chunk(chunk)
+        while pending:
+            write_oldest()
+        finish_writes()
         if dec:
             dec.wait(timeout=30)
 
@@ -295,6 +407,17 @@ def export_stream_generator(
         logger.error(f"Export error {video_id}: {e}")
         yield json.dumps({"type": "error", "error": "Export failed unexpectedly"}) + "\n"
     finally:
+        if remux and remux.poll() is None:
+            remux.kill()
+            remux.wait()
+        if writer_thread and writer_thread.is_alive():
+            try:
+                while True:
+                    write_queue.get_nowait()
+            except queue.Empty:
+                pass
+            write_queue.put_nowait(None)
+            writer_thread.join(timeout=5)
         if cap:
             cap.release()
         if out:
@@ -3,21 +3,23 @@ import asyncio
 import logging
 import os
 import re
+import shutil
 import uuid
+from pathlib import Path
 
+import cv2
 import httpx
 
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
-import cv2
 from fastapi import BackgroundTasks, Depends, FastAPI, File, Header, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
-from pipeline.blur import _blur_frame
+from pipeline.blur import _blur_frame, _pad_frame_plan
 from pipeline.detector import DETECTOR_POOL_SIZE, get_face_detector, get_thread_pool
 from jobs.job_runner import cancel_detection_job, register_cancel_token, run_queued_detection_job, unregister_cancel_token
 from jobs.queue_manager import (
@@ -32,19 +34,25 @@ from jobs.queue_manager import (
 from pipeline.reid import get_reid_model
 from config import (
     CHUNK_SIZE,
+    MAX_UPLOAD_BYTES,
     MAX_UPLOAD_SIZE_MB,
     VIDEO_PROCESSING_CONFIG,
     cleanup_old_files,
     get_allowed_origins,
     get_safe_video_path,
+    open_capture,
     periodic_cleanup,
+    preallocate_file,
+    probe_uploaded_video,
+    probe_video,
+    probe_video_stream,
     validate_environment,
     validate_video_file,
 )
-from pipeline.processor import ENCODER_ARGS, apply_job_thread_budget, get_encoder, process_detection
+from pipeline.processor import DECODER_ARGS, ENCODER_ARGS, apply_job_thread_budget, get_encoder, process_detection
 from storage import get_job_result, get_tracks, store_job_result, store_tracks
 from jobs.stream_generators import detect_stream_generator, export_stream_generator
-from pipeline.tracker import _precompute_track_lookups
+from pipeline.tracker import _precompute_frame_plan
 
 
 # ---------------------------------------------------------------------------
@@ -115,6 +123,9 @@ class ExportRequest(BaseModel):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     validate_environment()
+    # Frames are already spread across the detector/blur thread pool; OpenCV's own
+    # parallel_for inside each worker would oversubscribe the cores.
+    cv2.setNumThreads(1)
     get_face_detector()
     get_reid_model()
 
@@ -182,6 +193,19 @@ def _get_redis_client(request: Request):
     return redis_client
 
 
+def _save_upload(src, video_path: Path) -> int:
+    """Copy the upload Starlette has already spooled into place in one worker call.
+    Returns its size; nothing is written when it exceeds MAX_UPLOAD_BYTES."""
+    size = src.seek(0, os.SEEK_END)
+    if MAX_UPLOAD_BYTES and size > MAX_UPLOAD_BYTES:
+        return size
+    src.seek(0)
+    with open(video_path, "wb") as handle:
+        preallocate_file(handle, size)
+        shutil.copyfileobj(src, handle, CHUNK_SIZE)
+    return size
+
+
 # ---------------------------------------------------------------------------
 # Video Endpoints
 # ---------------------------------------------------------------------------
@@ -194,44 +218,27 @@ async def health():
 @limiter.limit("10/minute")
 async def upload_video(request: Request, file: UploadFile = File(...), _: bool = Depends(verify_api_key)):
     validate_video_file(file.filename or "video.mp4", file.content_type)
-    if MAX_UPLOAD_SIZE_MB > 0:
-        content_length = request.headers.get("content-length")
-        if content_length:
-            try:
-                if int(content_length) > MAX_UPLOAD_SIZE_MB * 1024 * 1024:
-                    raise HTTPException(status_code=413, detail=f"Video too large. Maximum size is {MAX_UPLOAD_SIZE_MB}MB.")
-            except ValueError:
-                pass
+    try:
+        content_length = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        content_length = 0
+    if MAX_UPLOAD_BYTES and content_length > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Video too large. Maximum size is {MAX_UPLOAD_SIZE_MB}MB.")
 
     video_id = str(uuid.uuid4())
     video_path = get_safe_video_path(video_id, ".mp4")
-    max_size = MAX_UPLOAD_SIZE_MB * 1024 * 1024 if MAX_UPLOAD_SIZE_MB > 0 else 0
-    size = 0
     try:
-        with open(video_path, "wb") as handle:
-            while chunk := await file.read(CHUNK_SIZE):
-                size += len(chunk)
-                if max_size and size > max_size:
-                    video_path.unlink(missing_ok=True)
-                    raise HTTPException(status_code=413, detail=f"Video too large. Maximum size is {MAX_UPLOAD_SIZE_MB}MB.")
-                handle.write(chunk)
+        size = await asyncio.to_thread(_save_upload, file.file, video_path)
+        if MAX_UPLOAD_BYTES and size > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Video too large. Maximum size is {MAX_UPLOAD_SIZE_MB}MB.")
 
-        cap = cv2.VideoCapture(str(video_path))
-        if not cap.isOpened():
+        metadata = await asyncio.to_thread(probe_uploaded_video, video_path)
+        if metadata is None:
             video_path.unlink(missing_ok=True)
             raise HTTPException(status_code=400, detail="Invalid video file.")
 
-        fps = float(cap.get(cv2.CAP_PROP_FPS)) or 30.0
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        cap.release()
-
         request.app.state.logger.info(f"Uploaded video {video_id}")
-        return {
-            "videoId": video_id,
-            "metadata": {"fps": fps, "width": width, "height": height, "frameCount": frame_count},
-        }
+        return {"videoId": video_id, "metadata": metadata}
     except HTTPException:
         raise
     except Exception as e:
@@ -317,11 +324,16 @@ def export_video(video_id: str, request: Request, export_request: ExportRequest,
             tracks=tracks,
             input_path=input_path,
             output_path=output_path,
-            precompute_track_lookups=_precompute_track_lookups,
+            precompute_frame_plan=_precompute_frame_plan,
+            pad_frame_plan=_pad_frame_plan,
+            probe_video=probe_video,
+            probe_video_stream=probe_video_stream,
+            open_capture=open_capture,
             get_thread_pool=get_thread_pool,
             detector_pool_size=DETECTOR_POOL_SIZE,
             get_encoder=get_encoder,
             encoder_args=ENCODER_ARGS,
+            decoder_args=DECODER_ARGS,
             get_safe_video_path=get_safe_video_path,
             blur_frame=_blur_frame,
             logger=request.app.state.logger,
@@ -350,31 +362,43 @@ async def reupload_from_url(body: dict, _: bool = Depends(verify_api_key)):
             async with client.stream("GET", url) as r:
                 if r.status_code != 200:
                     raise HTTPException(status_code=502, detail="Failed to fetch video from storage")
+                try:
+                    expected = int(r.headers.get("content-length") or 0)
+                except ValueError:
+                    expected = 0
+                if MAX_UPLOAD_BYTES and expected > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413, detail=f"Video too large. Maximum size is {MAX_UPLOAD_SIZE_MB}MB."
+                    )
+                size = 0
                 with open(video_path, "wb") as f:
-                    async for chunk in r.aiter_bytes(65536):
-                        f.write(chunk)
+                    # Only reserve space when the upload limit bounds what the remote can claim.
+                    if MAX_UPLOAD_BYTES:
+                        await asyncio.to_thread(preallocate_file, f, expected)
+                    async for chunk in r.aiter_bytes(CHUNK_SIZE):
+                        size += len(chunk)
+                        if MAX_UPLOAD_BYTES and size > MAX_UPLOAD_BYTES:
+                            break
+                        await asyncio.to_thread(f.write, chunk)
+                    await asyncio.to_thread(f.truncate, f.tell())
+                if MAX_UPLOAD_BYTES and size > MAX_UPLOAD_BYTES:
+                    video_path.unlink(missing_ok=True)
+                    raise HTTPException(
+                        status_code=413, detail=f"Video too large. Maximum size is {MAX_UPLOAD_SIZE_MB}MB."
+                    )
 
-        cap = cv2.VideoCapture(str(video_path))
-        if not cap.isOpened():
+        metadata = await asyncio.to_thread(probe_uploaded_video, video_path)
+        if metadata is None:
             video_path.unlink(missing_ok=True)
             raise HTTPException(status_code=400, detail="Downloaded file is not a valid video")
 
-        fps = float(cap.get(cv2.CAP_PROP_FPS)) or 30.0
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        cap.release()
-
         # If tracks were provided (project restore), store them so export works immediately
         if tracks and isinstance(tracks, list):
             store_tracks(video_id, tracks)
             logger.info(f"Restored {len(tracks)} tracks for video {video_id}")
 
         logger.info(f"Re-uploaded project video as {video_id}")
-        return {
-            "videoId": video_id,
-            "metadata": {"fps": fps, "width": width, "height": height, "frameCount": frame_count},
-        }
+        return {"videoId": video_id, "metadata": metadata}
     except HTTPException:
         raise
     except Exception as e:
@@ -416,7 +440,8 @@ async def job_result(job_id: str, _: bool = Depends(verify_api_key)):
     result = get_job_result(job_id)
     if result is None:
         raise HTTPException(status_code=404, detail="Job result not found")
-    return result
+    # Already plain JSON types; skip jsonable_encoder's walk over every frame dict.
+    return ORJSONResponse(content=result)
 
 
 if __name__ == "__main__":
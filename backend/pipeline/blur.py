@@ -3,6 +3,8 @@
 # regions using an elliptical mask. Runs inside the thread pool during export.
 # ---------------------------------------------------------------------------
 
+from functools import lru_cache
+
 import cv2
 import numpy as np
 
@@ -11,30 +13,54 @@ import numpy as np
 # Blur
 # ---------------------------------------------------------------------------
 
+# Padded boxes change size most frames, so only a few recent sizes are worth keeping;
+# a 4K face mask is ~1MB, which keeps the cache to tens of MB at worst.
+@lru_cache(maxsize=32)
+def _ellipse_mask(w: int, h: int) -> np.ndarray:
+    """Boolean (h, w, 1) ellipse mask, cached for faces whose size holds across frames."""
+    mask = np.zeros((h, w), dtype=np.uint8)
+    cv2.ellipse(mask, (w // 2, h // 2), (w // 2, h // 2), 0, 0, 360, 255, -1)
+    mask = mask.astype(bool)[:, :, np.newaxis]
+    mask.flags.writeable = False
+    return mask
+
+
+def _pad_frame_plan(
+    frame_plan: list[list[list[float]]], padding: float, width: int, height: int
+) -> list[list[list[int]]]:
+    """Pad and clamp every bbox in the plan to integer (x, y, w, h) rects in one vectorised pass.
+    Rects that end up empty are dropped."""
+    counts = np.fromiter((len(b) for b in frame_plan), dtype=np.intp, count=len(frame_plan))
+    rects_plan: list[list[list[int]]] = [[] for _ in frame_plan]
+    if not counts.any():
+        return rects_plan
+    boxes = np.array([b for bboxes in frame_plan for b in bboxes], dtype=np.float64).reshape(-1, 4)
+    ox, oy, ow, oh = boxes.T
+    x = np.maximum(0, (ox - ow * padding).astype(np.int64))
+    y = np.maximum(0, (oy - oh * padding).astype(np.int64))
+    w = np.minimum((ow * (1 + padding * 2)).astype(np.int64), width - x)
+    h = np.minimum((oh * (1 + padding * 2)).astype(np.int64), height - y)
+    keep = (w > 0) & (h > 0)
+    frame_of = np.repeat(np.arange(len(frame_plan)), counts)[keep]
+    for fi, rect in zip(frame_of.tolist(), np.stack([x, y, w, h], axis=1)[keep].tolist()):
+        rects_plan[fi].append(rect)
+    return rects_plan
+
+
 def _blur_frame(args: tuple) -> tuple[int, np.ndarray]:
-    idx, frame, track_lookup_dicts, padding, target_blocks, width, height, blur_mode = args
-    for lookup in track_lookup_dicts:
-        det = lookup.get(int(idx))
-        if det is None:
-            continue
-        ox, oy, ow, oh = det["bbox"]
-        x = max(0, int(ox - ow * padding))
-        y = max(0, int(oy - oh * padding))
-        w = min(int(ow * (1 + padding * 2)), width - x)
-        h = min(int(oh * (1 + padding * 2)), height - y)
-        if w > 0 and h > 0:
-            region = frame[y:y + h, x:x + w]
-            mask = np.zeros((h, w), dtype=np.uint8)
-            cv2.ellipse(mask, (w // 2, h // 2), (w // 2, h // 2), 0, 0, 360, 255, -1)
-            if blur_mode == "blackout":
-                replacement = np.zeros_like(region)
-            else:
-                block_size = max(6, min(w, h) // target_blocks)
-                small = cv2.resize(
-                    region,
-                    (max(1, w // block_size), max(1, h // block_size)),
-                    interpolation=cv2.INTER_LINEAR,
-                )
-                replacement = cv2.resize(small, (w, h), interpolation=cv2.INTER_NEAREST)
-            frame[y:y + h, x:x + w] = np.where(mask[:, :, np.newaxis], replacement, region)
+    idx, frame, rects, target_blocks, blur_mode = args
+    for x, y, w, h in rects:
+        region = frame[y:y + h, x:x + w]
+        mask = _ellipse_mask(w, h)
+        if blur_mode == "blackout":
+            np.copyto(region, 0, where=mask)
+        else:
+            block_size = max(6, min(w, h) // target_blocks)
+            small = cv2.resize(
+                region,
+                (max(1, w // block_size), max(1, h // block_size)),
+                interpolation=cv2.INTER_LINEAR,
+            )
+            replacement = cv2.resize(small, (w, h), interpolation=cv2.INTER_NEAREST)
+            np.copyto(region, replacement, where=mask)
     return (idx, frame)
\ No newline at end of file
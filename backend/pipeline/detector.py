@@ -9,6 +9,7 @@ import threading
 import logging
 import multiprocessing
 import os
+import queue
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 import onnxruntime as ort
@@ -21,10 +22,25 @@ logger = logging.getLogger(__name__)
 # ---------------------------------------------------------------------------
 
 FACE_DETECTION_CONFIG = {"score_threshold": 0.55, "nms_threshold": 0.25, "max_faces": 5000}
+_SCORE_THRESHOLD = FACE_DETECTION_CONFIG["score_threshold"]
+_NMS_THRESHOLD = FACE_DETECTION_CONFIG["nms_threshold"]
 
 DETECTOR_POOL_SIZE = int(os.environ.get("DETECTOR_POOL_SIZE", max(2, multiprocessing.cpu_count())))
 
 
+def _resolve_providers(raw: str) -> list[str]:
+    """ONNX_PROVIDERS (comma-separated, in priority order) filtered to this onnxruntime build.
+    CPUExecutionProvider is always appended as the fallback."""
+    available = ort.get_available_providers()
+    requested = [p.strip() for p in raw.split(",") if p.strip()]
+    missing = [p for p in requested if p not in available]
+    if missing:
+        logger.warning(f"ONNX providers not available, ignoring: {', '.join(missing)}")
+    return [p for p in requested if p in available and p != "CPUExecutionProvider"] + ["CPUExecutionProvider"]
+
+
+ONNX_PROVIDERS = _resolve_providers(os.environ.get("ONNX_PROVIDERS", ""))
+
 _SCRFD_SIZE = 640
 _scrfd_anchors: dict = {}
 _SCRFD_INPUT = "input.1"
@@ -33,6 +49,7 @@ _SCRFD_STRIDES = [
     ("466", "469", "472", 16),
     ("486", "489", "492", 32),
 ]
+_SCRFD_OUTPUTS = [name for score, bbox, kps, _ in _SCRFD_STRIDES for name in (score, bbox, kps)]
 
 # ---------------------------------------------------------------------------
 # Internal pool state
@@ -40,10 +57,11 @@ _SCRFD_STRIDES = [
 
 _thread_pool: ThreadPoolExecutor | None = None
 _model_path: Path | None = None
-_detector_pool: list = []
-_pool_lock = threading.Lock()
-_pool_semaphore: threading.Semaphore | None = None
+_detector_q: queue.Queue = queue.Queue()  # idle sessions; get() blocks while all are leased
+_pool_loaded = False
+_pool_lock = threading.Lock()  # serialises pool (re)builds only, not leases
 _onnx_thread_budget = max(1, int(os.environ.get("ONNX_THREAD_BUDGET", "2")))
+_tls = threading.local()  # per-worker letterbox canvas, reused across frames
 
 
 # ---------------------------------------------------------------------------
@@ -53,8 +71,9 @@ _onnx_thread_budget = max(1, int(os.environ.get("ONNX_THREAD_BUDGET", "2")))
 def _get_model_path() -> Path:
     global _model_path
     if _model_path is None:
-        backend_dir = Path(__file__).resolve().parent.parent
-        _model_path = backend_dir / "models" / "scrfd_2.5g.onnx"
+        models_dir = Path(__file__).resolve().parent.parent / "models"
+        int8 = models_dir / "scrfd_2.5g_int8.onnx"
+        _model_path = int8 if int8.exists() else models_dir / "scrfd_2.5g.onnx"
     return _model_path
 
 
@@ -73,27 +92,30 @@ def _create_session(model_path: str) -> ort.InferenceSession:
     return ort.InferenceSession(
         model_path,
         sess_options=opts,
-        providers=["CPUExecutionProvider"],
+        providers=ONNX_PROVIDERS,
     )
 
 
 def _rebuild_pool_locked() -> None:
-    global _detector_pool, _pool_semaphore
+    """Fill the (empty) session queue with fresh sessions at the current thread budget."""
+    global _pool_loaded
     model_path_obj = _get_model_path()
     if not model_path_obj.exists():
         raise FileNotFoundError(f"SCRFD model not found at {model_path_obj}")
     model_path = str(model_path_obj)
-    _detector_pool = [_create_session(model_path) for _ in range(DETECTOR_POOL_SIZE)]
-    _pool_semaphore = threading.Semaphore(DETECTOR_POOL_SIZE)
+    sessions = [_create_session(model_path) for _ in range(DETECTOR_POOL_SIZE)]
+    for session in sessions:
+        _detector_q.put(session)
+    _pool_loaded = True
 
 
 def get_face_detector() -> None:
-    """Initializes the detector session on CPU."""
+    """Initializes the detector session pool."""
     with _pool_lock:
-        if not _detector_pool:
+        if not _pool_loaded:
             _rebuild_pool_locked()
             logger.info(
-                f"SCRFD: {DETECTOR_POOL_SIZE} independent sessions on CPU, "
+                f"SCRFD ({_get_model_path().stem}): {DETECTOR_POOL_SIZE} independent sessions on {ONNX_PROVIDERS[0]}, "
                 f"input size {_SCRFD_SIZE}, thread budget {_onnx_thread_budget}"
             )
     get_thread_pool()
@@ -106,46 +128,59 @@ def apply_thread_budget(n_threads: int) -> None:
     if target_threads == _onnx_thread_budget:
         return
 
-    if _pool_semaphore is None and not _detector_pool:
+    if not _pool_loaded:
+        _onnx_thread_budget = target_threads
+        return
+
+    # Take every idle session without blocking; if any is leased the pool is busy.
+    taken = []
+    for _ in range(DETECTOR_POOL_SIZE):
+        try:
+            taken.append(_detector_q.get_nowait())
+        except queue.Empty:
+            break
+
+    if len(taken) < DETECTOR_POOL_SIZE:
+        # Pool busy — hand back what we took and defer the rebuild.
+        for session in taken:
+            _detector_q.put(session)
         _onnx_thread_budget = target_threads
+        logger.info(f"SCRFD pool busy — thread budget deferred to {_onnx_thread_budget}")
         return
 
-    if _pool_semaphore is not None:
-        acquired = 0
-        for _ in range(DETECTOR_POOL_SIZE):
-            if _pool_semaphore.acquire(blocking=False):
-                acquired += 1
-            else:
-                break
-
-        if acquired < DETECTOR_POOL_SIZE:
-            # Pool busy — release what we grabbed and defer the rebuild.
-            for _ in range(acquired):
-                _pool_semaphore.release()
-            _onnx_thread_budget = target_threads
-            logger.info(f"SCRFD pool busy — thread budget deferred to {_onnx_thread_budget}")
-            return
-
-        # All slots acquired (pool idle) — safe to rebuild without blocking callers.
-        with _pool_lock:
-            _onnx_thread_budget = target_threads
+    # All sessions taken (pool idle) — rebuild; callers block on the queue meanwhile.
+    with _pool_lock:
+        _onnx_thread_budget = target_threads
+        try:
             _rebuild_pool_locked()
-            logger.info(f"SCRFD thread budget updated to {_onnx_thread_budget}")
+        except Exception:
+            for session in taken:
+                _detector_q.put(session)
+            raise
+        logger.info(f"SCRFD thread budget updated to {_onnx_thread_budget}")
 
 
 class _DetectorLease:
     def __enter__(self):
-        if _pool_semaphore is None:
+        if not _pool_loaded:
             raise RuntimeError("Detector pool is not initialized")
-        _pool_semaphore.acquire()
-        with _pool_lock:
-            self._det = _detector_pool.pop()
+        self._det = _detector_q.get()
         return self._det
 
     def __exit__(self, *_):
-        with _pool_lock:
-            _detector_pool.append(self._det)
-        _pool_semaphore.release()
+        _detector_q.put(self._det)
+
+
+def _get_canvas(nh: int, nw: int) -> np.ndarray:
+    """This thread's letterbox canvas; the padding is re-zeroed only when the frame size changes."""
+    canvas = getattr(_tls, "canvas", None)
+    if canvas is None:
+        canvas = _tls.canvas = np.zeros((_SCRFD_SIZE, _SCRFD_SIZE, 3), dtype=np.uint8)
+        _tls.fill = (nh, nw)
+    elif _tls.fill != (nh, nw):
+        canvas.fill(0)
+        _tls.fill = (nh, nw)
+    return canvas
 
 
 def _get_scrfd_anchors() -> dict:
@@ -162,13 +197,12 @@ def _get_scrfd_anchors() -> dict:
 def _scrfd_decode(outputs: list, output_names: list, scale: float) -> list[dict]:
     named = {n: o for n, o in zip(output_names, outputs)}
     anchors = _get_scrfd_anchors()
-    thresh = FACE_DETECTION_CONFIG["score_threshold"]
     all_boxes, all_scores, all_kps = [], [], []
     for score_key, bbox_key, kps_key, stride in _SCRFD_STRIDES:
         score = named[score_key].reshape(-1)
         bbox  = named[bbox_key].reshape(-1, 4) * stride
         kps   = named[kps_key].reshape(-1, 10) * stride  # 5 points × 2 coords
-        mask = score >= thresh
+        mask = score >= _SCORE_THRESHOLD
         if not mask.any():
             continue
         a = anchors[stride][mask]
@@ -188,27 +222,31 @@ def _scrfd_decode(outputs: list, output_names: list, scale: float) -> list[dict]
     boxes  = np.concatenate(all_boxes)
     scores = np.concatenate(all_scores)
     kps_all = np.concatenate(all_kps)
-    idx = cv2.dnn.NMSBoxes(boxes.tolist(), scores.tolist(), thresh, FACE_DETECTION_CONFIG["nms_threshold"])
+    idx = cv2.dnn.NMSBoxes(boxes, scores, _SCORE_THRESHOLD, _NMS_THRESHOLD)
     if not len(idx):
         return []
-    sel = idx.flatten()
-    return [{"bbox": boxes[i].tolist(), "score": float(scores[i]),
-             "kps": kps_all[i].tolist()} for i in sel]
+    sel = np.asarray(idx).reshape(-1)
+    return [{"bbox": b, "score": s, "kps": k}
+            for b, s, k in zip(boxes[sel].tolist(), scores[sel].tolist(), kps_all[sel].tolist())]
 
 
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
 
-def detect_faces(image: np.ndarray) -> list[dict]:
-    """Detect faces in a BGR image."""
+def detect_faces(image: np.ndarray, source_scale: float = 1.0) -> list[dict]:
+    """Detect faces in a BGR image. If the image was already downscaled from the source
+    frame by `source_scale`, boxes and keypoints are returned in source coordinates."""
     h, w = image.shape[:2]
     scale = min(1.0, _SCRFD_SIZE / max(h, w))
     nh, nw = int(h * scale), int(w * scale)
-    canvas = np.zeros((_SCRFD_SIZE, _SCRFD_SIZE, 3), dtype=np.uint8)
-    canvas[:nh, :nw] = cv2.resize(image, (nw, nh)) if scale < 1.0 else image[:nh, :nw]
-    blob = ((canvas[:, :, ::-1].astype(np.float32) - 127.5) / 128.0).transpose(2, 0, 1)[np.newaxis]
+    canvas = _get_canvas(nh, nw)
+    if scale < 1.0:
+        cv2.resize(image, (nw, nh), dst=canvas[:nh, :nw], interpolation=cv2.INTER_AREA)
+    else:
+        canvas[:nh, :nw] = image
+    # One fused pass for BGR->RGB, (x - 127.5) / 128 and HWC->NCHW.
+    blob = cv2.dnn.blobFromImage(canvas, 1.0 / 128.0, None, (127.5, 127.5, 127.5), swapRB=True)
     with _DetectorLease() as session:
-        output_names = [o.name for o in session.get_outputs()]
-        outputs = session.run(None, {_SCRFD_INPUT: blob})
-    return _scrfd_decode(outputs, output_names, scale)
\ No newline at end of file
+        outputs = session.run(_SCRFD_OUTPUTS, {_SCRFD_INPUT: blob})
+    return _scrfd_decode(outputs, _SCRFD_OUTPUTS, scale * source_scale)
\ No newline at end of file
@@ -4,11 +4,13 @@
 # ---------------------------------------------------------------------------
 
 import logging
+import os
 import queue
 import shutil
 import subprocess
 import threading
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
 import cv2
@@ -16,6 +18,7 @@ import numpy as np
 import redis
 
 from pipeline.detector import (
+    _SCRFD_SIZE,
     DETECTOR_POOL_SIZE,
     apply_thread_budget as apply_detector_thread_budget,
     detect_faces,
@@ -25,7 +28,8 @@ from jobs.job_runner import CancellationToken
 from jobs.queue_manager import get_job_status
 from pipeline.reid import apply_thread_budget as apply_reid_thread_budget
 from pipeline.reid import merge_tracks_by_identity
-from storage import store_tracks
+from config import open_capture, probe_video
+from storage import get_cached_tracks, store_cached_tracks, store_tracks
 from pipeline.tracker import track_detections
 
 logger = logging.getLogger(__name__)
@@ -87,6 +91,16 @@ def get_encoder() -> str:
     return _h264_encoder
 
 
+# ---------------------------------------------------------------------------
+# Decoder selection
+# ---------------------------------------------------------------------------
+
+# Optional ffmpeg hwaccel for decoding (e.g. "cuda", "vaapi", "auto"). Frames are
+# still piped back as bgr24, ffmpeg downloads them from the device itself.
+FFMPEG_HWACCEL = os.environ.get("FFMPEG_HWACCEL", "").strip()
+DECODER_ARGS: list[str] = ["-hwaccel", FFMPEG_HWACCEL] if FFMPEG_HWACCEL else []
+
+
 # ---------------------------------------------------------------------------
 # Thread budget
 # ---------------------------------------------------------------------------
@@ -114,14 +128,19 @@ def process_detection(
     thread_budget: int | None = None,
     cancel_token: CancellationToken | None = None,
 ) -> list[dict]:
-    cap = cv2.VideoCapture(str(video_path))
-    if not cap.isOpened():
+    cached = get_cached_tracks(video_id, sample_rate, video_path)
+    if cached is not None:
+        logger.info(f"Reusing detection results for {video_id} at sample rate {sample_rate}")
+        store_tracks(video_id, cached)
+        if progress_cb:
+            progress_cb(100)
+        return cached
+
+    meta = probe_video(video_path)
+    if meta is None:
         raise RuntimeError("Could not open video file")
 
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    cap.release()
+    total_frames, width, height = meta["frameCount"], meta["width"], meta["height"]
 
     total_steps = max(1, (total_frames + sample_rate - 1) // sample_rate) if total_frames > 0 else 1
     completed_steps = 0
@@ -130,7 +149,7 @@ def process_detection(
 
     _own_pool = thread_budget is not None
     pool = ThreadPoolExecutor(max_workers=max(1, thread_budget)) if _own_pool else get_thread_pool()
-    pending_futures: list[tuple[int, object]] = []
+    pending_futures: deque[tuple[int, object]] = deque()
     max_pending = (max(1, thread_budget) if _own_pool else DETECTOR_POOL_SIZE) * 2
 
     cut_thumb = (64, 36)
@@ -139,6 +158,7 @@ def process_detection(
     prev_thumb: np.ndarray | None = None
     last_cut_fi = -999
 
+
     def emit_progress(value: float) -> None:
         if progress_cb:
             progress_cb(value)
@@ -155,9 +175,8 @@ def process_detection(
                 last_cut_fi = fi
         prev_thumb = gray
 
-    def drain_one() -> None:
+    def collect(idx: int, fut) -> None:
         nonlocal completed_steps
-        idx, fut = pending_futures.pop(0)
         try:
             faces = fut.result()
             if faces:
@@ -168,18 +187,44 @@ def process_detection(
         completed_steps += 1
         emit_progress(round(completed_steps / total_steps * 80, 1))
 
+    def drain_ready() -> None:
+        # Results land in a dict keyed by frame, so collect whatever has finished instead of
+        # blocking on the oldest frame while later ones sit done.
+        nonlocal pending_futures
+        wait({fut for _, fut in pending_futures}, return_when=FIRST_COMPLETED)
+        waiting: deque[tuple[int, object]] = deque()
+        for entry in pending_futures:
+            if entry[1].done():
+                collect(*entry)
+            else:
+                waiting.append(entry)
+        pending_futures = waiting
+
+    # Decoding runs on a reader thread feeding a bounded queue (ffmpeg when available,
+    # OpenCV otherwise), so decode overlaps with detection in either case.
+    fq: queue.Queue = queue.Queue(maxsize=max_pending * 2)
+    proc: subprocess.Popen | None = None
+    # Frames are downscaled to the detector input size by the reader, so only small frames
+    # are queued and detect_faces skips its own resize; it gets frame_scale to map boxes back.
+    frame_scale = min(1.0, _SCRFD_SIZE / max(width, height)) if width > 0 and height > 0 else 1.0
+    dw, dh = int(width * frame_scale), int(height * frame_scale)
+
     if shutil.which("ffmpeg") and width > 0 and height > 0 and total_frames > 0:
-        frame_size = width * height * 3
+        vf = f"select=not(mod(n\\,{sample_rate}))"
+        if frame_scale < 1.0:
+            vf += f",scale={dw}:{dh}:flags=area"
+        frame_size = dw * dh * 3
         proc = subprocess.Popen(
             [
                 "ffmpeg",
                 "-hide_banner",
                 "-loglevel",
                 "fatal",
+                *DECODER_ARGS,
                 "-i",
                 str(video_path),
                 "-vf",
-                f"select=not(mod(n\\,{sample_rate}))",
+                vf,
                 "-vsync",
                 "vfr",
                 "-f",
@@ -191,7 +236,6 @@ def process_detection(
             stdout=subprocess.PIPE,
             stderr=subprocess.DEVNULL,
         )
-        fq: queue.Queue = queue.Queue(maxsize=max_pending * 2)
 
         def reader() -> None:
             emitted = 0
@@ -200,57 +244,60 @@ def process_detection(
                     raw = proc.stdout.read(frame_size)
                     if not raw or len(raw) < frame_size:
                         break
-                    frame = np.frombuffer(raw, np.uint8).reshape((height, width, 3)).copy()
+                    # Read-only view over the pipe bytes; detection never writes to the frame.
+                    frame = np.frombuffer(raw, np.uint8).reshape((dh, dw, 3))
                     fq.put((emitted * sample_rate, frame))
                     emitted += 1
             finally:
                 fq.put(None)
-
-        threading.Thread(target=reader, daemon=True).start()
-
-        while True:
-            item = fq.get()
-            if item is None:
-                break
-            if cancel_token and cancel_token.cancelled:
-                proc.kill()
-                break
-            fi, frame = item
-            check_cut(fi, frame)
-            pending_futures.append((fi, pool.submit(detect_faces, frame)))
-            while len(pending_futures) >= max_pending:
-                drain_one()
-
-        proc.wait(timeout=30)
     else:
-        cap = cv2.VideoCapture(str(video_path))
+        cap = open_capture(video_path)
         if not cap.isOpened():
             raise RuntimeError("Could not open video file")
 
-        target_idx = 0
-        current_frame = 0
-        while True:
-            if cancel_token and cancel_token.cancelled:
-                break
-            if total_frames > 0 and target_idx >= total_frames:
-                break
-            if target_idx != current_frame and not cap.set(cv2.CAP_PROP_POS_FRAMES, target_idx):
-                break
+        def reader() -> None:
+            # Walk the stream sequentially: grab() skipped frames without converting them
+            # instead of seeking, which re-decodes from the previous keyframe every time.
+            fi = 0
+            try:
+                while not (cancel_token and cancel_token.cancelled):
+                    if not cap.grab():
+                        break
+                    if fi % sample_rate == 0:
+                        ret, frame = cap.retrieve()
+                        if not ret:
+                            break
+                        if frame_scale < 1.0:
+                            frame = cv2.resize(frame, (dw, dh), interpolation=cv2.INTER_AREA)
+                        fq.put((fi, frame))
+                    fi += 1
+            finally:
+                cap.release()
+                fq.put(None)
 
-            ret, frame = cap.read()
-            if not ret:
-                break
+    threading.Thread(target=reader, daemon=True).start()
 
-            current_frame = target_idx + 1
-            check_cut(target_idx, frame)
-            pending_futures.append((target_idx, pool.submit(detect_faces, frame)))
-            while len(pending_futures) >= max_pending:
-                drain_one()
-            target_idx += sample_rate
-        cap.release()
+    while True:
+        item = fq.get()
+        if item is None:
+            break
+        if cancel_token and cancel_token.cancelled:
+            if proc:
+                proc.kill()
+            while fq.get() is not None:  # let the reader finish and exit
+                pass
+            break
+        fi, frame = item
+        check_cut(fi, frame)
+        pending_futures.append((fi, pool.submit(detect_faces, frame, frame_scale)))
+        while len(pending_futures) >= max_pending:
+            drain_ready()
+
+    if proc:
+        proc.wait(timeout=30)
 
     while pending_futures:
-        drain_one()
+        collect(*pending_futures.popleft())
 
     if _own_pool:
         pool.shutdown(wait=True)
@@ -264,6 +311,7 @@ def process_detection(
     if not detections_per_frame:
         logger.info(f"No faces detected in {video_id}")
         store_tracks(video_id, [])
+        store_cached_tracks(video_id, sample_rate, video_path, [])
         emit_progress(100)
         return []
 
@@ -279,6 +327,7 @@ def process_detection(
             frame_data.pop("emb", None)
 
     store_tracks(video_id, tracks)
+    store_cached_tracks(video_id, sample_rate, video_path, tracks)
     emit_progress(100)
     return tracks
 
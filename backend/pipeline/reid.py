@@ -13,6 +13,9 @@ from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import onnxruntime as ort
 
+from config import open_capture
+from pipeline.detector import ONNX_PROVIDERS
+
 logger = logging.getLogger(__name__)
 
 
@@ -77,7 +80,7 @@ def _create_reid_session(path: Path) -> ort.InferenceSession:
     return ort.InferenceSession(
         str(path),
         sess_options=opts,
-        providers=["CPUExecutionProvider"],
+        providers=ONNX_PROVIDERS,
     )
 
 
@@ -281,11 +284,11 @@ def _pick_sample_frames(frames: list[dict]) -> list[dict]:
 def _embed_single(session: ort.InferenceSession, input_name: str,
                   face_112: np.ndarray) -> np.ndarray:
     """Embed a single 112×112 face with horizontal-flip augmentation."""
-    blob_orig = _preprocess_single(face_112)
-    blob_flip = _preprocess_single(face_112[:, ::-1].copy())
-    out_orig = session.run(None, {input_name: blob_orig})[0].flatten()
-    out_flip = session.run(None, {input_name: blob_flip})[0].flatten()
-    emb = out_orig + out_flip
+    blob = np.concatenate(
+        [_preprocess_single(face_112), _preprocess_single(face_112[:, ::-1].copy())], axis=0
+    )
+    out = session.run(None, {input_name: blob})[0]  # (2, D): original + flipped
+    emb = out[0] + out[1]
     norm = np.linalg.norm(emb)
     return emb / norm if norm > 1e-8 else emb
 
@@ -302,15 +305,14 @@ def _embed_crops(session: ort.InferenceSession,
     all_embs = []
     for start in range(0, len(crops), _EMBED_BATCH_SIZE):
         batch = crops[start:start + _EMBED_BATCH_SIZE]
-        blob_orig = np.concatenate(
-            [_preprocess_single(c) for c in batch], axis=0
-        )
-        blob_flip = np.concatenate(
-            [_preprocess_single(c[:, ::-1].copy()) for c in batch], axis=0
+        # Originals and their flips go through a single forward pass.
+        blob = np.concatenate(
+            [_preprocess_single(c) for c in batch]
+            + [_preprocess_single(c[:, ::-1].copy()) for c in batch],
+            axis=0,
         )
-        out_orig = session.run(None, {input_name: blob_orig})[0]  # (B, D)
-        out_flip = session.run(None, {input_name: blob_flip})[0]  # (B, D)
-        embs = out_orig + out_flip  # (B, D)
+        out = session.run(None, {input_name: blob})[0]  # (2B, D)
+        embs = out[:len(batch)] + out[len(batch):]  # (B, D)
         norms = np.linalg.norm(embs, axis=1, keepdims=True)
         norms = np.maximum(norms, 1e-8)
         all_embs.append(embs / norms)
@@ -428,7 +430,7 @@ def merge_tracks_by_identity(tracks: list[dict], video_path: Path, cancel_token=
     if not _reid_pool or len(tracks) < 2:
         return [{**t, "mergedFrom": [t["id"]]} for t in tracks]
 
-    cap = cv2.VideoCapture(str(video_path))
+    cap = open_capture(video_path)
     if not cap.isOpened():
         return [{**t, "mergedFrom": [t["id"]]} for t in tracks]
 
@@ -437,8 +439,9 @@ def merge_tracks_by_identity(tracks: list[dict], video_path: Path, cancel_token=
         i for i, t in enumerate(tracks)
         if len(t["frames"]) >= _MIN_EMBEDDABLE_SAMPLES
     ]
+    embeddable_set = set(embeddable_indices)
     non_embeddable_indices = [
-        i for i in range(len(tracks)) if i not in set(embeddable_indices)
+        i for i in range(len(tracks)) if i not in embeddable_set
     ]
     if non_embeddable_indices:
         logger.info(
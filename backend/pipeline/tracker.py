@@ -1,6 +1,7 @@
 # ---------------------------------------------------------------------------
-# IoU/appearance-based multi-object tracker with scene-cut awareness and a
-# lazy TrackLookup for gap-interpolated bbox queries during export.
+# IoU/appearance-based multi-object tracker with scene-cut awareness, a
+# lazy TrackLookup for gap-interpolated bbox queries, and the dense per-frame
+# blur plan used during export.
 # ---------------------------------------------------------------------------
 
 import bisect
@@ -302,8 +303,33 @@ class TrackLookup:
         }
 
 
-def _precompute_track_lookups(
+def _precompute_frame_plan(
     tracks_frames: list[list[dict]], total_frames: int, max_gap: int = 36
-) -> list[TrackLookup]:
-    """Build one TrackLookup per track. max_gap = max interpolation distance."""
-    return [TrackLookup(frames, max_gap) for frames in tracks_frames]
\ No newline at end of file
+) -> list[list[list[float]]]:
+    """Dense per-frame list of bboxes across all tracks, same semantics as TrackLookup.get.
+
+    Each track is held as contiguous frame-index / bbox arrays and interpolated over its
+    whole span at once, so the export loop does a single list index per frame.
+    """
+    last_fi = max((f["frameIndex"] for frames in tracks_frames for f in frames), default=-1)
+    plan: list[list[list[float]]] = [[] for _ in range(max(total_frames, last_fi + 1))]
+    for frames in tracks_frames:
+        if not frames:
+            continue
+        by_idx = {f["frameIndex"]: f["bbox"] for f in frames}
+        keys = sorted(by_idx)
+        indices = np.array(keys, dtype=np.int64)
+        boxes = np.array([by_idx[fi] for fi in keys], dtype=np.float64).reshape(-1, 4)
+
+        fis = np.arange(indices[0], indices[-1] + 1)
+        lo = np.searchsorted(indices, fis, side="right") - 1
+        hi = np.minimum(lo + 1, len(indices) - 1)
+        fi0, fi1 = indices[lo], indices[hi]
+        exact = fis == fi0
+        keep = exact | (fi1 - fi0 <= max_gap)
+        t = np.where(exact, 0.0, (fis - fi0) / np.maximum(fi1 - fi0, 1))[:, np.newaxis]
+        bboxes = boxes[lo] + t * (boxes[hi] - boxes[lo])
+
+        for fi, bbox in zip(fis[keep].tolist(), bboxes[keep].tolist()):
+            plan[fi].append(bbox)
+    return plan
@@ -1,13 +1,15 @@
 # ---------------------------------------------------------------------------
 # Thread-safe store for detection tracks and job results.
 # In-memory dict as hot cache, disk files as durable fallback.
+# Finished detection runs are also kept per (video_id, sample_rate) on disk.
 # Disk files are cleaned up by the periodic cleanup in config.py (1hr TTL).
 # ---------------------------------------------------------------------------
 
-import json
 import threading
 from pathlib import Path
 
+import orjson
+
 from config import TEMP_DIR
 
 _detection_store: dict[str, list[dict]] = {}
@@ -23,7 +25,7 @@ def store_tracks(video_id: str, tracks: list[dict]) -> None:
     with _store_lock:
         _detection_store[video_id] = tracks
     try:
-        _disk_path(video_id, "_tracks.json").write_text(json.dumps(tracks))
+        _disk_path(video_id, "_tracks.json").write_bytes(orjson.dumps(tracks))
     except Exception:
         pass
 
@@ -33,7 +35,7 @@ def store_job_result(job_id: str, video_id: str, tracks: list[dict]) -> None:
     with _store_lock:
         _job_result_store[job_id] = payload
     try:
-        _disk_path(job_id, "_result.json").write_text(json.dumps(payload))
+        _disk_path(job_id, "_result.json").write_bytes(orjson.dumps(payload))
     except Exception:
         pass
 
@@ -47,7 +49,7 @@ def get_job_result(job_id: str) -> dict | None:
     path = _disk_path(job_id, "_result.json")
     if path.exists():
         try:
-            data = json.loads(path.read_text())
+            data = orjson.loads(path.read_bytes())
             with _store_lock:
                 _job_result_store[job_id] = data
             return data
@@ -65,10 +67,45 @@ def get_tracks(video_id: str) -> list[dict] | None:
     path = _disk_path(video_id, "_tracks.json")
     if path.exists():
         try:
-            data = json.loads(path.read_text())
+            data = orjson.loads(path.read_bytes())
             with _store_lock:
                 _detection_store[video_id] = data
             return data
         except Exception:
             pass
     return None
+
+
+def _video_stamp(video_path: Path) -> list[int] | None:
+    try:
+        st = video_path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def store_cached_tracks(
+    video_id: str, sample_rate: int, video_path: Path, tracks: list[dict]
+) -> None:
+    """Remember a finished detection run, keyed to the video file it was computed from."""
+    stamp = _video_stamp(video_path)
+    if stamp is None:
+        return
+    try:
+        payload = {"stamp": stamp, "tracks": tracks}
+        _disk_path(video_id, f"_tracks_s{sample_rate}.json").write_bytes(orjson.dumps(payload))
+    except Exception:
+        pass
+
+
+def get_cached_tracks(video_id: str, sample_rate: int, video_path: Path) -> list[dict] | None:
+    path = _disk_path(video_id, f"_tracks_s{sample_rate}.json")
+    if not path.exists():
+        return None
+    try:
+        data = orjson.loads(path.read_bytes())
+    except Exception:
+        return None
+    if data.get("stamp") != _video_stamp(video_path):
+        return None
+    return data.get("tracks")
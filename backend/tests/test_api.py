@@ -1,9 +1,12 @@
 import os
 import io
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
+import main
+
 
 @pytest.fixture(autouse=True)
 def _dev_mode(monkeypatch):
@@ -65,3 +68,29 @@ class TestJobStatus:
         resp = client.get("/job/a1b2c3d4-e5f6-7890-abcd-ef1234567890/status")
         # If Redis is unavailable returns 503, otherwise 404
         assert resp.status_code in (404, 503)
+
+
+class TestReuploadFromUrl:
+    @pytest.mark.parametrize("announce_length", [True, False])
+    def test_rejects_oversized_remote_file(self, client, monkeypatch, announce_length):
+        async def body():
+            for _ in range(4):
+                yield b"\x00" * 1024
+
+        def handler(request):
+            if announce_length:
+                return httpx.Response(200, content=b"\x00" * 4096)
+            return httpx.Response(200, content=body())  # chunked, no Content-Length
+
+        real_client = httpx.AsyncClient
+        transport = httpx.MockTransport(handler)
+        monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 1024)
+        monkeypatch.setattr(
+            main.httpx, "AsyncClient", lambda **kw: real_client(transport=transport, **kw)
+        )
+
+        resp = client.post(
+            "/reupload-from-url",
+            json={"url": "https://bucket.s3.amazonaws.com/video.mp4"},
+        )
+        assert resp.status_code == 413
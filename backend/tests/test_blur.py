@@ -0,0 +1,46 @@
+import pytest
+
+from pipeline.blur import _pad_frame_plan
+
+
+def _scalar_pad(bboxes, padding, width, height):
+    """Per-box padding and clamping as _blur_frame did it before the plan was vectorised."""
+    rects = []
+    for ox, oy, ow, oh in bboxes:
+        x = max(0, int(ox - ow * padding))
+        y = max(0, int(oy - oh * padding))
+        w = min(int(ow * (1 + padding * 2)), width - x)
+        h = min(int(oh * (1 + padding * 2)), height - y)
+        if w > 0 and h > 0:
+            rects.append([x, y, w, h])
+    return rects
+
+
+# ---------------------------------------------------------------------------
+# Frame plan padding
+# ---------------------------------------------------------------------------
+class TestPadFramePlan:
+    @pytest.mark.parametrize("padding", [0.0, 0.3, 0.75])
+    def test_matches_scalar_padding(self, padding):
+        width, height = 320, 240
+        plan = [
+            [[100.4, 80.6, 40.2, 50.9]],  # inside the frame
+            [[-10.0, -5.0, 30.0, 30.0], [300.0, 220.0, 40.0, 40.0]],  # corner overhangs
+            [],
+            [[0.0, 0.0, 320.0, 240.0]],  # whole frame
+            [[400.0, 50.0, 20.0, 20.0], [50.0, -90.0, 20.0, 20.0]],  # fully outside
+            [[10.0, 10.0, 0.0, 12.0], [5.5, 5.5, 0.9, 0.9]],  # degenerate sizes
+            [[319.0, 239.0, 1.0, 1.0]],  # last pixel
+        ]
+        padded = _pad_frame_plan(plan, padding, width, height)
+        assert len(padded) == len(plan)
+        for bboxes, rects in zip(plan, padded):
+            assert rects == _scalar_pad(bboxes, padding, width, height)
+
+    def test_out_of_frame_boxes_are_dropped(self):
+        plan = [[[400.0, 50.0, 20.0, 20.0]], [[50.0, 300.0, 20.0, 20.0]]]
+        assert _pad_frame_plan(plan, 0.3, 320, 240) == [[], []]
+
+    def test_empty(self):
+        assert _pad_frame_plan([[], []], 0.3, 320, 240) == [[], []]
+        assert _pad_frame_plan([], 0.3, 320, 240) == []
@@ -1,11 +1,19 @@
 import os
+import types
 
 import pytest
 from fastapi import HTTPException
 
+import config
 from config import (
+    cleanup_old_files,
     get_allowed_origins,
     get_safe_video_path,
+    preallocate_file,
+    probe_uploaded_video,
+    probe_video,
+    probe_video_stream,
+    sniff_video_magic,
     validate_environment,
     validate_video_file,
     validate_video_id,
@@ -34,6 +42,10 @@ class TestValidateVideoId:
         with pytest.raises(HTTPException):
             validate_video_id("")
 
+    def test_rejects_trailing_newline(self):
+        with pytest.raises(HTTPException):
+            validate_video_id("a1b2c3d4-e5f6-7890-abcd-ef1234567890\n")
+
 
 # ---------------------------------------------------------------------------
 # get_safe_video_path
@@ -86,6 +98,120 @@ class TestValidateVideoFile:
         validate_video_file("video.mp4", None)
 
 
+# ---------------------------------------------------------------------------
+# probe_video
+# ---------------------------------------------------------------------------
+class TestProbeVideo:
+    def test_missing_file(self, tmp_path):
+        assert probe_video(tmp_path / "missing.mp4") is None
+
+    def test_unreadable_file(self, tmp_path):
+        path = tmp_path / "garbage.mp4"
+        path.write_bytes(b"not a video")
+        assert probe_video(path) is None
+
+    def test_uploaded_rejects_bad_magic_before_probing(self, tmp_path, monkeypatch):
+        path = tmp_path / "garbage.mp4"
+        path.write_bytes(b"not a video at all")
+        monkeypatch.setattr(config, "probe_video", lambda p: pytest.fail("probed a non-video"))
+        assert probe_uploaded_video(path) is None
+
+    def test_uploaded_probes_sniffed_container(self, tmp_path, monkeypatch):
+        path = tmp_path / "clip.mp4"
+        path.write_bytes(b"\x00\x00\x00\x18ftypmp42")
+        meta = {"fps": 25.0, "width": 64, "height": 48, "frameCount": 10}
+        monkeypatch.setattr(config, "probe_video", lambda p: meta)
+        assert probe_uploaded_video(path) == meta
+
+
+# ---------------------------------------------------------------------------
+# probe_video_stream
+# ---------------------------------------------------------------------------
+class TestProbeVideoStream:
+    def test_missing_file(self, tmp_path):
+        assert probe_video_stream(tmp_path / "missing.mp4") is None
+
+    def test_none_without_ffprobe(self, tmp_path, monkeypatch):
+        path = tmp_path / "video.mp4"
+        path.write_bytes(b"x")
+        monkeypatch.setattr(config.shutil, "which", lambda name: None)
+        assert probe_video_stream(path) is None
+
+    def test_parses_first_stream(self, tmp_path, monkeypatch):
+        path = tmp_path / "video.mp4"
+        path.write_bytes(b"xy")
+        out = b'{"streams": [{"codec_name": "h264", "profile": "High", "pix_fmt": "yuv420p"}]}'
+        monkeypatch.setattr(config.shutil, "which", lambda name: "/usr/bin/ffprobe")
+        monkeypatch.setattr(
+            config.subprocess, "run",
+            lambda *a, **kw: types.SimpleNamespace(returncode=0, stdout=out),
+        )
+        assert probe_video_stream(path) == {
+            "codec_name": "h264", "profile": "High", "pix_fmt": "yuv420p",
+        }
+
+
+# ---------------------------------------------------------------------------
+# sniff_video_magic
+# ---------------------------------------------------------------------------
+class TestSniffVideoMagic:
+    @pytest.mark.parametrize("head", [
+        b"\x00\x00\x00\x20ftypisom\x00\x00\x02\x00",
+        b"\x00\x00\x00\x14ftypqt  \x20\x05\x03\x00",
+        b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01\x42\xf7\x81",
+        b"RIFF\x00\x10\x00\x00AVI LIST",
+    ])
+    def test_accepts_known_containers(self, tmp_path, head):
+        path = tmp_path / "video"
+        path.write_bytes(head + b"\x00" * 32)
+        assert sniff_video_magic(path) is True
+
+    def test_rejects_garbage(self, tmp_path):
+        path = tmp_path / "video.mp4"
+        path.write_bytes(b"<html>not a video</html>")
+        assert sniff_video_magic(path) is False
+
+    def test_missing_file(self, tmp_path):
+        assert sniff_video_magic(tmp_path / "missing.mp4") is False
+
+
+# ---------------------------------------------------------------------------
+# preallocate_file
+# ---------------------------------------------------------------------------
+class TestPreallocateFile:
+    def test_truncates_back_to_written_size(self, tmp_path):
+        path = tmp_path / "upload.mp4"
+        with open(path, "wb") as handle:
+            preallocate_file(handle, 1 << 20)
+            handle.write(b"abc")
+            handle.truncate(handle.tell())
+        assert path.read_bytes() == b"abc"
+
+    def test_zero_size_is_noop(self, tmp_path):
+        path = tmp_path / "upload.mp4"
+        with open(path, "wb") as handle:
+            preallocate_file(handle, 0)
+        assert path.stat().st_size == 0
+
+
+# ---------------------------------------------------------------------------
+# cleanup_old_files
+# ---------------------------------------------------------------------------
+class TestCleanupOldFiles:
+    def test_removes_only_expired_files(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "TEMP_DIR", tmp_path)
+        old, fresh = tmp_path / "old.mp4", tmp_path / "fresh.mp4"
+        old.write_bytes(b"x")
+        fresh.write_bytes(b"x")
+        (tmp_path / "subdir").mkdir()
+        stale = os.path.getmtime(old) - 2 * 3600
+        os.utime(old, (stale, stale))
+        cleanup_old_files()
+        assert not old.exists()
+        assert fresh.exists()
+        assert (tmp_path / "subdir").is_dir()
+
+
 # ---------------------------------------------------------------------------
 # validate_environment
 # ---------------------------------------------------------------------------
@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+import pytest
+
+import pipeline.processor as processor
+
+
+def _frame(level: int, box: tuple[int, int] | None = None) -> np.ndarray:
+    frame = np.full((480, 640, 3), level, np.uint8)
+    if box is not None:
+        x, y = box
+        frame[y:y + 10, x:x + 10] = 255
+    return frame
+
+
+# ---------------------------------------------------------------------------
+# Per-frame detection
+# ---------------------------------------------------------------------------
+@pytest.fixture
+def run_detection(tmp_path, monkeypatch):
+    """Run process_detection over synthetic frames with a stub detector (OpenCV reader)."""
+    calls: list[int] = []
+    captured: dict = {}
+
+    def fake_detect(frame, source_scale=1.0):
+        # "Detects" the bright square, so a stale result would show up as a stale box.
+        calls.append(len(calls))
+        ys, xs = np.nonzero(frame[:, :, 0] > 200)
+        if not len(xs):
+            return []
+        return [{"bbox": [int(xs.min()), int(ys.min()), 10, 10], "score": 0.9}]
+
+    def fake_track(detections, cut_frames):
+        captured["detections"], captured["cuts"] = detections, cut_frames
+        return []
+
+    monkeypatch.setattr(processor.shutil, "which", lambda name: None)
+    monkeypatch.setattr(processor, "detect_faces", fake_detect)
+    monkeypatch.setattr(processor, "track_detections", fake_track)
+    monkeypatch.setattr(processor, "merge_tracks_by_identity", lambda tracks, *a, **kw: tracks)
+    monkeypatch.setattr(processor, "get_cached_tracks", lambda *a: None)
+    monkeypatch.setattr(processor, "store_tracks", lambda *a: None)
+    monkeypatch.setattr(processor, "store_cached_tracks", lambda *a: None)
+
+    def run(frames: list[np.ndarray]):
+        path = tmp_path / "clip.avi"
+        out = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 25, (640, 480))
+        for frame in frames:
+            out.write(frame)
+        out.release()
+        processor.process_detection("video", path, 1, thread_budget=1)
+        return calls, captured.get("detections", {}), captured.get("cuts", set())
+
+    return run
+
+
+class TestPerFrameDetection:
+    def test_small_moving_object_is_redetected(self, run_detection):
+        # A small box over a static background barely changes a frame-wide thumbnail diff;
+        # every sample must still be detected so the box follows the object.
+        positions = [(40 + i * 100, 200) for i in range(6)]
+        calls, detections, cuts = run_detection([_frame(90, p) for p in positions])
+        assert len(calls) == 6
+        assert not cuts
+        for fi, (x, y) in enumerate(positions):
+            bx, by = detections[fi][0]["bbox"][:2]
+            assert abs(bx - x) <= 2 and abs(by - y) <= 2
+
+    def test_static_frames_are_each_detected(self, run_detection):
+        calls, detections, _ = run_detection([_frame(90, (100, 100))] * 5)
+        assert len(calls) == 5
+        assert sorted(detections) == list(range(5))
+
+    def test_scene_cut_is_recorded(self, run_detection):
+        frames = [_frame(20, (50, 50))] * 4 + [_frame(160, (400, 300))] * 4
+        calls, detections, cuts = run_detection(frames)
+        assert cuts == {4}
+        assert len(calls) == 8
+        assert detections[4][0]["bbox"][:2] != detections[3][0]["bbox"][:2]
@@ -1,4 +1,11 @@
-from storage import get_job_result, get_tracks, store_job_result, store_tracks
+from storage import (
+    get_cached_tracks,
+    get_job_result,
+    get_tracks,
+    store_cached_tracks,
+    store_job_result,
+    store_tracks,
+)
 
 
 class TestTrackStorage:
@@ -26,3 +33,19 @@ class TestJobResultStorage:
 
     def test_get_missing_returns_none(self):
         assert get_job_result("nonexistent-job") is None
+
+
+class TestCachedTracks:
+    def test_hit_for_same_file_and_rate(self, tmp_path):
+        video = tmp_path / "video.mp4"
+        video.write_bytes(b"data")
+        store_cached_tracks("vid-3", 3, video, [{"id": 1}])
+        assert get_cached_tracks("vid-3", 3, video) == [{"id": 1}]
+        assert get_cached_tracks("vid-3", 2, video) is None
+
+    def test_miss_after_file_changes(self, tmp_path):
+        video = tmp_path / "video.mp4"
+        video.write_bytes(b"data")
+        store_cached_tracks("vid-4", 3, video, [{"id": 1}])
+        video.write_bytes(b"other data")
+        assert get_cached_tracks("vid-4", 3, video) is None
@@ -0,0 +1,19 @@
+import pytest
+
+from jobs.stream_generators import _can_stream_copy
+
+
+class TestCanStreamCopy:
+    def test_browser_safe_h264(self):
+        assert _can_stream_copy({"codec_name": "h264", "pix_fmt": "yuv420p", "profile": "High"})
+
+    @pytest.mark.parametrize("stream", [
+        None,
+        {},
+        {"codec_name": "hevc", "pix_fmt": "yuv420p", "profile": "Main"},
+        {"codec_name": "h264", "pix_fmt": "yuv420p10le", "profile": "High 10"},
+        {"codec_name": "h264", "pix_fmt": "yuv422p", "profile": "High 4:2:2"},
+        {"codec_name": "h264", "pix_fmt": "yuv444p", "profile": "High 4:4:4 Predictive"},
+    ])
+    def test_rejects_everything_else(self, stream):
+        assert not _can_stream_copy(stream)
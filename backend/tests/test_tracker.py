@@ -4,6 +4,7 @@ import pytest
 from pipeline.tracker import (
     TrackLookup,
     _iou,
+    _precompute_frame_plan,
     _center_distance,
     _similar_size,
     track_detections,
@@ -94,6 +95,38 @@ class TestTrackLookup:
         assert 100 not in lookup
 
 
+# ---------------------------------------------------------------------------
+# Frame plan
+# ---------------------------------------------------------------------------
+class TestFramePlan:
+    def test_matches_track_lookup(self):
+        tracks = [
+            [
+                {"frameIndex": 0, "bbox": [0, 0, 10, 10], "score": 0.9},
+                {"frameIndex": 10, "bbox": [10, 10, 10, 10], "score": 0.8},
+                {"frameIndex": 100, "bbox": [50, 50, 10, 10], "score": 0.8},
+            ],
+            [{"frameIndex": 5, "bbox": [30, 30, 5, 5], "score": 0.7}],
+        ]
+        plan = _precompute_frame_plan(tracks, 120, max_gap=36)
+        lookups = [TrackLookup(frames, max_gap=36) for frames in tracks]
+        assert len(plan) == 120
+        for fi, bboxes in enumerate(plan):
+            expected = [d["bbox"] for d in (lu.get(fi) for lu in lookups) if d is not None]
+            assert len(bboxes) == len(expected)
+            for got, want in zip(bboxes, expected):
+                assert got == pytest.approx(want)
+
+    def test_extends_past_total_frames(self):
+        tracks = [[{"frameIndex": 20, "bbox": [0, 0, 10, 10], "score": 0.9}]]
+        plan = _precompute_frame_plan(tracks, 1)
+        assert len(plan) == 21
+        assert plan[20] == [[0, 0, 10, 10]]
+
+    def test_empty(self):
+        assert _precompute_frame_plan([], 3) == [[], [], []]
+
+
 # ---------------------------------------------------------------------------
 # track_detections end-to-end
 # ---------------------------------------------------------------------------